@@ -0,0 +1,63 @@
+import os
+import sys
+import logging
+import argparse
+from utils.config_loader import load_config, load_settings
+from utils.archive_store import find_archived, get_latest_per_name, restore_archived, pack_loose_files, DEFAULT_MAX_BUNDLE_MB
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)s | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Look up, restore and pack archived statement files.")
+    parser.add_argument("command", choices=["find", "restore", "pack"],
+                        help="find: list matching files, restore: copy them back to the input folder "
+                             "for reprocessing, pack: move files archived as-is into bundles")
+    parser.add_argument("--card", action="store_true", help="use the card statement archive")
+    parser.add_argument("--name", help="file name, wildcards allowed")
+    parser.add_argument("--hash", help="SHA-256 of the file content, or a prefix of it")
+    parser.add_argument("--date", help="archiving date or date prefix, e.g. 2024-03")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    paths = load_config('config.yaml')
+    archive_settings = load_settings('config.yaml', 'archive')
+    prefix = "card_" if args.card else ""
+    archive_folder = paths[f"{prefix}processed_folder"]
+    input_folder = paths[f"{prefix}input_folder"]
+
+    if args.command == "pack":
+        packed = pack_loose_files(archive_folder, archive_settings.get('max_bundle_mb') or DEFAULT_MAX_BUNDLE_MB)
+        logging.info(f"{packed} file(s) packed into bundles.")
+        return
+
+    entries = find_archived(archive_folder, name=args.name, file_hash=args.hash, date=args.date)
+    if args.command == "find":
+        for entry in entries:
+            print(f"{entry['archived']}  {entry['sha256'][:16]}  {entry['size']:>10}  {entry['name']}  ({entry['bundle']})")
+        logging.info(f"{len(entries)} archived file(s) found.")
+        return
+
+    if not args.name and not args.hash:
+        logging.error("Restore requires --name or --hash.")
+        sys.exit(1)
+
+    # A file name is restored once, with its most recently archived content
+    restored_file_no = 0
+    for entry in get_latest_per_name(entries):
+        try:
+            destination = restore_archived(archive_folder, entry, input_folder)
+            restored_file_no += 1
+            logging.info(f"Restored '{entry['name']}' to '{os.path.relpath(destination)}'.")
+        except Exception as e:
+            logging.error(f"Failed to restore {entry['name']}: {type(e).__name__} - {e}")
+            continue
+
+    logging.info(f"{restored_file_no} file(s) restored.")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import os
 import logging
 import glob
-from utils.config_loader import load_config
+from utils.config_loader import load_config, load_settings
 from utils.input_file_wrapper import parse_cc_statement_file
 from utils.entries_processor import move_file_to_archive, write_output_file, assign_years
 
@@ -13,6 +13,7 @@ logging.basicConfig(
 
 def main():
     paths = load_config('config.yaml')
+    archive_settings = load_settings('config.yaml', 'archive')
 
     logging.info("Starting card statement conversion process...")
     processed_file_no = 0
@@ -22,7 +23,7 @@ def main():
             transactions = parse_cc_statement_file(txt_file)
             transactions = assign_years(transactions)
             write_output_file(transactions, txt_file, paths['card_output_folder'], index)
-            move_file_to_archive(txt_file, paths['card_processed_folder'])
+            move_file_to_archive(txt_file, paths['card_processed_folder'], archive_settings)
             processed_file_no += 1
             logging.info(f"Successfully processed '{os.path.relpath(txt_file)}'.")
         except Exception as e:
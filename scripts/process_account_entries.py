@@ -1,7 +1,7 @@
 import os
 import logging
 import glob
-from utils.config_loader import load_config
+from utils.config_loader import load_config, load_settings
 from utils.category_map import load_category_rules
 from utils.input_file_wrapper import get_df_from_csv_nordea
 from utils.entries_processor import load_category_model, categorize_entries, write_output_files, move_file_to_archive
@@ -15,6 +15,7 @@ logging.basicConfig(
 def main():
     use_ml_model = [False]
     paths = load_config('config.yaml', use_ml_model)
+    archive_settings = load_settings('config.yaml', 'archive')
 
     # Load ML model or category rules
     key_file = {True: 'model_file', False: 'category_file'}[use_ml_model[0]]
@@ -29,7 +30,7 @@ def main():
             entries = get_df_from_csv_nordea(csv_file)
             categorize_entries(entries, resource)
             write_output_files(entries, csv_file, paths['output_folder'], index)
-            move_file_to_archive(csv_file, paths['processed_folder'])
+            move_file_to_archive(csv_file, paths['processed_folder'], archive_settings)
             processed_file_no += 1
             logging.info(f"Successfully processed '{os.path.relpath(csv_file)}'.")
         except Exception as e:
@@ -1,55 +1,53 @@
-import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
 from sklearn.model_selection import cross_val_score, StratifiedKFold
 from sklearn.model_selection import GridSearchCV
-from utils.dataset_enricher import enrich_dataframe, get_feature_list, get_text_feature, get_numeric_features, get_categorical_features, get_target_label
+from sklearn.base import clone
+from utils.config_loader import load_settings
+from utils.dataset_enricher import get_feature_list
+from utils.feature_store import load_feature_set, validate_store_settings
+from utils.model_benchmark import benchmark_model, mark_pareto_front, select_candidate, validate_budget, write_report
 import joblib
+import logging
+import sys
 import os
 
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)s | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
 def main():
+    # Validate the feature store limits and model selection budget before the long training run
+    try:
+        store_settings = validate_store_settings(load_settings('config.yaml', 'feature_store'))
+        budget = validate_budget(load_settings('config.yaml', 'training'))
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
+
     # Load historical expenses
     script_dir = os.path.dirname(os.path.abspath(__file__))
     training_file = os.path.join(script_dir, "..", "data", "training_data.csv")
-    df = pd.read_csv(training_file, sep=';', encoding='ansi', dtype=str, keep_default_na=False)
-
-    # Prepare data
-    enrich_dataframe(df)
-    X = df[get_feature_list()]
-    y = df[get_target_label()]  # target label
-
-    numeric_transformer = StandardScaler()
-    text_transformer = TfidfVectorizer(lowercase=True, stop_words=None)
-    categorical_transformer = OneHotEncoder(handle_unknown="ignore")
-
-    # Combine them in a single ColumnTransformer
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("text", text_transformer, get_text_feature()),
-            ("num", numeric_transformer, get_numeric_features()),
-            ("cat", categorical_transformer, get_categorical_features()),
-        ],
-        remainder="drop"  # drop other columns if any
-    )
+    store_folder = os.path.join(script_dir, "..", "data", "feature_store")
+
+    # Prepare data: the enriched and featurized data is materialized in the feature store,
+    # so only a changed training file or changed feature definitions are recomputed
+    feature_set = load_feature_set(training_file, store_folder, store_settings)
+    X = feature_set['matrix']
+    y = feature_set['labels']  # target label
+    preprocessor = feature_set['preprocessor']
 
     # Use a RandomForest ensemble method, cross-validation, 
     # and Grid Search for Hyperparameter tuning
     rf = RandomForestClassifier(class_weight='balanced', random_state=42)
 
-    # Build the final pipeline: ColumnTransformer + Voting
-    pipeline = Pipeline([
-        ("preprocessor", preprocessor),
-        ("rf", rf)
-    ])
-
     # Evaluate the pipeline with cross-validation - default Hyperparameters
     cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-    scores = cross_val_score(pipeline, X, y, cv=cv, scoring='precision_macro', n_jobs=-1)
+    scores = cross_val_score(rf, X, y, cv=cv, scoring='precision_macro', n_jobs=-1)
     
     print("Pipeline cross-validation precision scores:", scores)
     print("Mean precision:", scores.mean())
@@ -57,17 +55,18 @@ def main():
     # Hyperparameter Tuning with GridSearchCV
     # Define parameters to tune
     param_grid = {
-        'rf__n_estimators': [100, 200],
-        'rf__max_depth': [None, 10, 20],
-        'rf__min_samples_split': [2, 5]
+        'n_estimators': [100, 200],
+        'max_depth': [None, 10, 20],
+        'min_samples_split': [2, 5]
     }
 
     grid_search = GridSearchCV(
-        pipeline,
+        rf,
         param_grid,
         cv=cv,
         scoring='precision_macro',
         n_jobs=-1,
+        refit=False,  # candidates are fitted on the training split below
         verbose=2
     )
 
@@ -76,17 +75,48 @@ def main():
     print("Best params:", grid_search.best_params_)
     print("Best cross-validation precision:", grid_search.best_score_)
 
-    # Evaluate the Best Model
-    best_model = grid_search.best_estimator_
-    
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # Train
-    best_model.fit(X_train, y_train)
+    # Split data, keeping the raw features of the test rows to benchmark the full pipeline
+    features = feature_set['features'][get_feature_list()]
+    X_train, X_test, y_train, y_test, _, features_test = train_test_split(
+        X, y, features, test_size=0.2, random_state=42)
+
+    # Benchmark every candidate: besides precision, the model is paid for on every
+    # processing run with its artifact size, load time and prediction time
+    os.makedirs("models", exist_ok=True)
+    candidates = []
+    candidate_models = []  # fitted pipelines, kept apart from the JSON report
+    for index, params in enumerate(grid_search.cv_results_['params']):
+        candidate_rf = clone(rf).set_params(**params)
+        candidate_rf.fit(X_train, y_train)
+        candidate_model = Pipeline([
+            ("preprocessor", preprocessor),
+            ("rf", candidate_rf)
+        ])
+        candidate = {
+            'params': params,
+            'precision_macro': float(grid_search.cv_results_['mean_test_score'][index]),
+            'precision_macro_std': float(grid_search.cv_results_['std_test_score'][index]),
+        }
+        candidate.update(benchmark_model(candidate_model, features_test, "models"))
+        candidates.append(candidate)
+        candidate_models.append(candidate_model)
+        print(f"Candidate {params}: precision {candidate['precision_macro']:.4f}, "
+              f"size {candidate['size_mb']} MB, load {candidate['load_ms']} ms, "
+              f"predict {candidate['predict_ms']} ms ({candidate['rows_per_sec']} rows/s)")
+
+    print("Pareto front:")
+    for candidate in mark_pareto_front(candidates):
+        print(f"  {candidate['params']}")
+
+    # Select the most precise model within the budget configured in config.yaml
+    selected = select_candidate(candidates, budget)
+    print("Selected params:", selected['params'])
+
+    # The selected pipeline (fitted ColumnTransformer + RandomForest) is already trained on the training split
+    best_model = candidate_models[candidates.index(selected)]
 
     # Evaluate
-    y_pred = best_model.predict(X_test)
+    y_pred = best_model.named_steps['rf'].predict(X_test)
 
     print("Classification Report:")
     print(classification_report(y_test, y_pred))
@@ -96,5 +126,8 @@ def main():
     joblib.dump(best_model, model_path)
     print(f"Model saved to {model_path}")
 
+    report_path = os.path.splitext(model_path)[0] + ".benchmark.json"
+    write_report(report_path, candidates, selected, budget, len(features_test))
+
 if __name__ == "__main__":
     main()
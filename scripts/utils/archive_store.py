@@ -0,0 +1,215 @@
+import os
+import glob
+import shutil
+import json
+import fnmatch
+import hashlib
+import logging
+import zipfile
+from datetime import datetime
+
+INDEX_FILE = "index.jsonl"
+BUNDLE_PATTERN = "archive-*.zip"
+DEFAULT_MAX_BUNDLE_MB = 64
+
+def archive_file(input_file: str, archive_folder: str, max_bundle_mb: float = DEFAULT_MAX_BUNDLE_MB,
+                 archived: datetime = None) -> dict:
+    """
+    Appends a processed file to the current LZMA-compressed zip bundle of the archive folder,
+    records it in the archive index and removes the input file.
+    'archived' is the archiving time recorded in the index, now by default.
+    Returns the index entry of the archived file.
+    """
+    return archive_files([input_file], archive_folder, max_bundle_mb, [archived])[0]
+
+def archive_files(input_files: list, archive_folder: str, max_bundle_mb: float = DEFAULT_MAX_BUNDLE_MB,
+                  archived_times: list = None) -> list:
+    """
+    Appends files to the current LZMA-compressed zip bundle of the archive folder, records
+    them in the archive index and removes the input files.
+    A new bundle is started once the current one reaches 'max_bundle_mb'.
+    Content already archived is not stored again, the new index entry points to the existing copy.
+    'archived_times' holds the archiving time recorded for each file, now by default.
+    A bundle is replaced as a whole and the index lines are flushed to disk before the input
+    files are removed, so a failure at any point loses neither inputs nor archived files.
+    Returns the index entries of the archived files.
+    """
+    for input_file in input_files:
+        if not os.path.exists(input_file):
+            raise FileNotFoundError(f"The file '{input_file}' does not exist.")
+    archived_times = archived_times or [None] * len(input_files)
+
+    archived_by_hash = {entry['sha256']: entry for entry in load_archive_index(archive_folder)}
+    ready = []    # (input file, entry) whose content is durably archived
+    pending = []  # (input file, entry) whose content is in the staged bundle
+    zf = None
+    try:
+        for input_file, archived in zip(input_files, archived_times):
+            file_hash = get_file_hash(input_file)
+            entry = {
+                'name': os.path.basename(input_file),
+                'sha256': file_hash,
+                'size': os.path.getsize(input_file),
+                'modified': datetime.fromtimestamp(os.path.getmtime(input_file)).isoformat(timespec='seconds'),
+                'archived': (archived or datetime.now()).isoformat(timespec='seconds'),
+            }
+
+            duplicate = archived_by_hash.get(file_hash)
+            if duplicate:
+                entry['bundle'] = duplicate['bundle']
+                entry['member'] = duplicate['member']
+                logging.info(f"Content of '{entry['name']}' already archived as '{entry['member']}'.")
+                in_staged_bundle = zf is not None and duplicate['bundle'] == os.path.basename(bundle)
+                (pending if in_staged_bundle else ready).append((input_file, entry))
+                continue
+
+            if zf is None:
+                bundle = get_current_bundle(archive_folder, max_bundle_mb)
+                zf = open_staged_bundle(bundle)
+                members = set(zf.namelist())
+            entry['bundle'] = os.path.basename(bundle)
+            entry['member'] = f"{file_hash[:16]}/{entry['name']}"
+            # The member is left without index entry if a previous attempt failed writing
+            # the index; the member name holds the content hash, so it can be reused
+            if entry['member'] in members:
+                logging.info(f"Reusing '{entry['member']}' found in '{entry['bundle']}' without index entry.")
+            else:
+                zf.write(input_file, arcname=entry['member'])
+                members.add(entry['member'])
+            archived_by_hash[file_hash] = entry
+            pending.append((input_file, entry))
+
+            if zf.fp.tell() >= max_bundle_mb * 1024 * 1024:
+                commit_staged_bundle(zf, bundle)
+                zf = None
+                ready.extend(pending)
+                pending = []
+
+        if zf is not None:
+            commit_staged_bundle(zf, bundle)
+            zf = None
+            ready.extend(pending)
+            pending = []
+    finally:
+        # Files already in a committed bundle are indexed and removed even if a later one failed
+        if zf is not None:
+            discard_staged_bundle(zf)
+        if ready:
+            append_index(archive_folder, [entry for _, entry in ready])
+            for input_file, _ in ready:
+                os.remove(input_file)
+
+    return [entry for _, entry in ready]
+
+def open_staged_bundle(bundle: str) -> zipfile.ZipFile:
+    # Appending rewrites the zip central directory: members are added to a copy of the
+    # bundle, so an interrupted append never leaves the bundle itself unreadable
+    staged = bundle + ".tmp"
+    if os.path.exists(bundle):
+        shutil.copyfile(bundle, staged)
+    elif os.path.exists(staged):
+        os.remove(staged)
+    return zipfile.ZipFile(staged, 'a', compression=zipfile.ZIP_LZMA)
+
+def commit_staged_bundle(zf: zipfile.ZipFile, bundle: str):
+    staged = zf.filename
+    zf.close()
+    with open(staged, 'rb+') as f:
+        os.fsync(f.fileno())
+    os.replace(staged, bundle)
+
+def discard_staged_bundle(zf: zipfile.ZipFile):
+    zf.close()
+    os.remove(zf.filename)
+
+def append_index(archive_folder: str, entries: list):
+    with open(os.path.join(archive_folder, INDEX_FILE), 'a', encoding='utf-8') as f:
+        f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+
+def get_current_bundle(archive_folder: str, max_bundle_mb: float) -> str:
+    bundles = sorted(glob.glob(os.path.join(archive_folder, BUNDLE_PATTERN)))
+    if bundles and os.path.getsize(bundles[-1]) < max_bundle_mb * 1024 * 1024:
+        return bundles[-1]
+    return os.path.join(archive_folder, f"archive-{len(bundles) + 1:04d}.zip")
+
+def get_file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_archive_index(archive_folder: str) -> list:
+    index_file = os.path.join(archive_folder, INDEX_FILE)
+    if not os.path.exists(index_file):
+        return []
+
+    entries = []
+    with open(index_file, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.warning(f"{INDEX_FILE} line {lineno}: Unreadable entry, skipping it.")
+    return entries
+
+def find_archived(archive_folder: str, name: str = None, file_hash: str = None, date: str = None) -> list:
+    """
+    Looks up archived files in the index.
+    - name: file name, wildcards allowed (e.g. '*-Francesco-*.csv')
+    - file_hash: SHA-256 of the content, or a prefix of it
+    - date: date or date prefix of the archiving time (e.g. '2024-03')
+    A file archived again with the same content (e.g. after being restored and reprocessed)
+    is returned once, with its most recent entry.
+    """
+    matches = {}
+    for entry in load_archive_index(archive_folder):
+        if name and not fnmatch.fnmatch(entry['name'], name):
+            continue
+        if file_hash and not entry['sha256'].startswith(file_hash.lower()):
+            continue
+        if date and not entry['archived'].startswith(date):
+            continue
+        # Index entries are appended in archiving order, later entries replace earlier ones
+        matches.pop((entry['name'], entry['sha256']), None)
+        matches[(entry['name'], entry['sha256'])] = entry
+    return list(matches.values())
+
+def get_latest_per_name(entries: list) -> list:
+    # Keeps the most recently archived entry of each file name
+    latest = {}
+    for entry in entries:
+        if entry['name'] not in latest or entry['archived'] >= latest[entry['name']]['archived']:
+            latest[entry['name']] = entry
+    return list(latest.values())
+
+def read_archived(archive_folder: str, entry: dict) -> bytes:
+    # Random access: only the requested member is decompressed
+    with zipfile.ZipFile(os.path.join(archive_folder, entry['bundle']), 'r') as zf:
+        return zf.read(entry['member'])
+
+def restore_archived(archive_folder: str, entry: dict, destination_folder: str) -> str:
+    destination = os.path.join(destination_folder, entry['name'])
+    if os.path.exists(destination):
+        raise FileExistsError(f"The file '{destination}' already exists.")
+    with open(destination, 'wb') as f:
+        f.write(read_archived(archive_folder, entry))
+    return destination
+
+def pack_loose_files(archive_folder: str, max_bundle_mb: float = DEFAULT_MAX_BUNDLE_MB) -> int:
+    # Moves files archived as-is in the folder into bundles. Their modification time, when
+    # they were moved to the folder, is kept as archiving time so date lookups still find them.
+    loose_files = []
+    for file_path in sorted(glob.glob(os.path.join(archive_folder, "*"))):
+        name = os.path.basename(file_path)
+        if (not os.path.isfile(file_path) or name == INDEX_FILE or name.endswith(".tmp")
+                or fnmatch.fnmatch(name, BUNDLE_PATTERN)):
+            continue
+        loose_files.append(file_path)
+
+    archived_times = [datetime.fromtimestamp(os.path.getmtime(f)) for f in loose_files]
+    return len(archive_files(loose_files, archive_folder, max_bundle_mb, archived_times))
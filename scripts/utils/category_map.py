@@ -1,8 +1,36 @@
 import os
 import sys
 import re
+import json
 import yaml
+import hashlib
 import logging
+import pandas as pd
+from datetime import datetime
+from utils.utils import parse_amount
+
+# Bump when the planning logic changes, to invalidate cached plans
+PLANNER_VERSION = 1
+# Training data of the ML model, resolved like in train_model.py
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "training_data.csv")
+MAX_SAMPLE_ROWS = 5000
+DEFAULT_SELECTIVITY = 0.5
+
+# Relative cost of evaluating a condition, by operator and column
+OPERATOR_COSTS = {
+    'equals': 1.0,
+    'startswith': 1.0,
+    'endswith': 1.0,
+    'greater_than': 1.5,
+    'less_than': 1.5,
+    'contains': 3.0,
+    'regex': 10.0,
+}
+COLUMN_COSTS = {'notes': 2.0}
+
+# Columns always produced by the statement parser
+STATEMENT_COLUMNS = ['Booking date', 'Amount', 'Amount_float', 'Amount DKK', 'Date_parsed',
+                     'Year', 'Month', 'Notes', 'Person', 'Type']
 
 def load_category_rules(yaml_file: str) -> list:
     # Loads category classification rules from a YAML file.
@@ -16,11 +44,196 @@ def load_category_rules(yaml_file: str) -> list:
         logging.info(f"{len(rules)} category rules successfully loaded.")
         if not rules:
             raise ValueError("No 'rules' key found in the YAML or it's empty.")
-        return rules
     except ValueError as e:
         logging.error(e)
         sys.exit(1)
 
+    try:
+        return get_rule_plan(yaml_file, rules)
+    except Exception as e:
+        logging.warning(f"Failed planning category rules, using them as written: {type(e).__name__} - {e}")
+        return rules
+
+def get_rule_plan(yaml_file: str, rules: list) -> list:
+    """
+    Returns the rules in their optimized evaluation plan, from the plan cache next to the
+    rules file ('<rules>.plan.json') when the rules and the sample data have not changed.
+    The plan file also holds the analysis report of the rule set.
+    """
+    plan_file = os.path.splitext(yaml_file)[0] + ".plan.json"
+    sample_file = SAMPLE_FILE
+
+    digest = hashlib.sha256(f"planner={PLANNER_VERSION}".encode())
+    for file_path in (yaml_file, sample_file):
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                digest.update(f.read())
+    key = digest.hexdigest()
+
+    if os.path.exists(plan_file):
+        try:
+            with open(plan_file, 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+            if plan.get('key') == key:
+                logging.info(f"Category rules plan loaded from '{os.path.relpath(plan_file)}' "
+                             f"({len(plan['findings'])} finding(s)).")
+                return plan['rules']
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable rules plan '{os.path.relpath(plan_file)}': {e}")
+
+    plan = plan_category_rules(rules, load_rule_sample(sample_file))
+    plan['key'] = key
+    plan['sample_file'] = os.path.abspath(sample_file)
+    for finding in plan['findings']:
+        logging.warning(f"Category rule {finding['rule']} ('{finding['category']}'): {finding['message']}")
+
+    with open(plan_file + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2, default=str)
+    os.replace(plan_file + ".tmp", plan_file)
+    logging.info(f"Category rules plan saved to '{os.path.relpath(plan_file)}' "
+                 f"({len(plan['rules'])} rule(s), {len(plan['findings'])} finding(s)).")
+    return plan['rules']
+
+def load_rule_sample(sample_file: str) -> list:
+    # Loads categorized entries used to measure how often each condition matches
+    if not os.path.exists(sample_file):
+        logging.info(f"No rules sample found at '{os.path.relpath(sample_file)}', "
+                     f"planning with a selectivity of {DEFAULT_SELECTIVITY} for every condition.")
+        return []
+    try:
+        df = pd.read_csv(sample_file, sep=';', encoding='ansi', dtype=str, keep_default_na=False)
+    except Exception as e:
+        logging.warning(f"Failed reading rules sample '{os.path.relpath(sample_file)}', "
+                        f"planning with a selectivity of {DEFAULT_SELECTIVITY} for every condition: {e}")
+        return []
+    df = df.head(MAX_SAMPLE_ROWS)
+    if 'Amount' in df.columns:
+        df['Amount_float'] = df['Amount'].apply(parse_amount).abs()
+    return df.to_dict('records')
+
+def plan_category_rules(rules: list, sample: list) -> dict:
+    """
+    Builds the evaluation plan of a rule set without changing which category a row gets:
+    - the conditions of each rule are ordered by cost / (1 - selectivity), so cheap conditions
+      that reject most rows run first; selectivity is measured on the sample rows if any;
+    - rules that can never match, or are shadowed by an earlier rule, are reported and dropped;
+    - rules on a column the statement parser does not produce are reported.
+    """
+    known_columns = set(STATEMENT_COLUMNS)
+    if sample:
+        known_columns.update(sample[0].keys())
+
+    planned_rules = []
+    statistics = []
+    findings = []
+    live_rules = []  # (position, conditions) of the rules that can match
+    for position, rule in enumerate(rules, start=1):
+        conditions = rule.get("conditions", []) or []
+        category = rule.get("category", "Uncategorized")
+
+        def report(kind: str, message: str):
+            findings.append({'rule': position, 'category': category, 'type': kind, 'message': message})
+
+        never_matches = False
+        keep_order = False
+        for cond in conditions:
+            column, operator, value = cond['column'], cond['operator'], cond['value']
+            if operator not in OPERATOR_COSTS:
+                report('never_matches', f"unknown operator '{operator}'.")
+                never_matches = True
+            elif operator in ('greater_than', 'less_than') and to_float(value) is None:
+                report('never_matches', f"non-numeric value '{value}' for '{operator}'.")
+                never_matches = True
+            elif operator == 'regex' and not is_valid_regex(value):
+                report('invalid_regex', f"invalid regular expression '{value}'.")
+                keep_order = True  # evaluation raises, keep the order it raises in
+            if column not in known_columns:
+                report('missing_column', f"column '{column}' is not produced by the statement parser, "
+                                         "the rule only matches if the input file has it.")
+        if never_matches:
+            continue
+
+        shadowing = next((p for p, earlier in live_rules if is_shadowed_by(conditions, earlier)), None)
+        if shadowing is not None:
+            report('shadowed', f"shadowed by rule {shadowing}, which matches every row this rule matches.")
+            continue
+        live_rules.append((position, conditions))
+
+        stats = [get_condition_stats(cond, sample) for cond in conditions]
+        order = list(range(len(conditions)))
+        if not keep_order:
+            order.sort(key=lambda i: get_condition_rank(stats[i]))
+        planned_rules.append({**rule, 'conditions': [conditions[i] for i in order]} if conditions else rule)
+        statistics.append({'rule': position, 'category': category, 'conditions': [stats[i] for i in order]})
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'sample_rows': len(sample),
+        'findings': findings,
+        'statistics': statistics,
+        'rules': planned_rules,
+    }
+
+def get_condition_stats(cond: dict, sample: list) -> dict:
+    column, operator, value = cond['column'], cond['operator'], cond['value']
+    cost = OPERATOR_COSTS[operator] * COLUMN_COSTS.get(str(column).lower(), 1.0)
+
+    selectivity = DEFAULT_SELECTIVITY
+    rows = [row for row in sample if column in row]
+    if rows and (operator != 'regex' or is_valid_regex(value)):
+        matches = sum(1 for row in rows if evaluate_condition(row, column, operator, value))
+        selectivity = matches / len(rows)
+
+    return {'column': column, 'operator': operator, 'value': value,
+            'cost': cost, 'selectivity': round(selectivity, 4)}
+
+def get_condition_rank(stats: dict) -> float:
+    # Expected cost per rejected row: conditions that always pass are evaluated last
+    if stats['selectivity'] >= 1:
+        return float('inf')
+    return stats['cost'] / (1 - stats['selectivity'])
+
+def is_shadowed_by(conditions: list, earlier_conditions: list) -> bool:
+    # True if every condition of the earlier rule is implied by a condition of this rule
+    return all(any(implies(cond, earlier) for cond in conditions) for earlier in earlier_conditions)
+
+def implies(cond: dict, other: dict) -> bool:
+    # True if 'cond' matching a row guarantees 'other' matches it too
+    if cond['column'] != other['column']:
+        return False
+    operator, other_operator = cond['operator'], other['operator']
+    if operator in ('greater_than', 'less_than') or other_operator in ('greater_than', 'less_than'):
+        value, other_value = to_float(cond['value']), to_float(other['value'])
+        if operator != other_operator or value is None or other_value is None:
+            return False
+        return value >= other_value if operator == 'greater_than' else value <= other_value
+    if operator == 'regex' or other_operator == 'regex':
+        return operator == other_operator and str(cond['value']) == str(other['value'])
+
+    # Text operators compare lowercased values, trimmed except for 'contains'
+    value = str(cond['value']).lower() if operator == 'contains' else str(cond['value']).strip().lower()
+    other_value = str(other['value']).lower() if other_operator == 'contains' else str(other['value']).strip().lower()
+    if other_operator == 'contains':
+        return other_value in value
+    if other_operator == operator == 'startswith' or (other_operator == 'startswith' and operator == 'equals'):
+        return value.startswith(other_value)
+    if other_operator == operator == 'endswith' or (other_operator == 'endswith' and operator == 'equals'):
+        return value.endswith(other_value)
+    return other_operator == operator == 'equals' and value == other_value
+
+def to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def is_valid_regex(value) -> bool:
+    try:
+        re.compile(str(value))
+        return True
+    except re.error:
+        return False
+
 def evaluate_condition(row, column, operator, value) -> bool:
     if column not in row:
         return False  # Column missing in data
@@ -3,7 +3,7 @@ import sys
 import yaml
 import logging
 
-def load_config(config_file: str, use_ml_model: list = None) -> dict:
+def read_config(config_file: str) -> dict:
     script_dir = os.path.dirname(os.path.abspath(__file__))
     config_file = os.path.join(script_dir, '..\\..', config_file)
     if not os.path.exists(config_file):
@@ -12,11 +12,19 @@ def load_config(config_file: str, use_ml_model: list = None) -> dict:
 
     with open(config_file, 'r', encoding='utf-8') as f:
         try:
-            config = yaml.safe_load(f)
+            return yaml.safe_load(f) or {}
         except Exception as e:
             logging.error(f"Failed parsing config file: {e}")
             sys.exit(1)
 
+def load_settings(config_file: str, section: str) -> dict:
+    # Returns a settings section of the config file, empty if missing
+    return read_config(config_file).get(section) or {}
+
+def load_config(config_file: str, use_ml_model: list = None) -> dict:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config = read_config(config_file)
+
     if 'paths' not in config:
         logging.error(f"Missing 'paths' key in {config_file}.")
         sys.exit(1)
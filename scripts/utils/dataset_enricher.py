@@ -1,4 +1,7 @@
 import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.feature_extraction.text import TfidfVectorizer
 
 def get_feature_list() -> list:
     return ['Notes', 'Person', 'Amount', 
@@ -33,4 +36,20 @@ def enrich_dataframe(df: pd.DataFrame):
                              (df['Month'] == 'Dec')).astype(int)
     df['IsXmasMonth'] = (df['Month'] == 'Dec').astype(int)
     df['IsSummerMonth'] = (df['Month'] == 'Jul').astype(int)
-    df['IsSchoolHolidayMonth'] = ((df['Month'] == 'Feb') | (df['Month'] == 'Oct')).astype(int)
\ No newline at end of file
+    df['IsSchoolHolidayMonth'] = ((df['Month'] == 'Feb') | (df['Month'] == 'Oct')).astype(int)
+
+def build_preprocessor() -> ColumnTransformer:
+    numeric_transformer = StandardScaler()
+    text_transformer = TfidfVectorizer(lowercase=True, stop_words=None)
+    categorical_transformer = OneHotEncoder(handle_unknown="ignore")
+
+    # Combine them in a single ColumnTransformer
+    return ColumnTransformer(
+        transformers=[
+            ("text", text_transformer, get_text_feature()),
+            ("num", numeric_transformer, get_numeric_features()),
+            ("cat", categorical_transformer, get_categorical_features()),
+        ],
+        remainder="drop",  # drop other columns if any
+        sparse_threshold=1.0  # always emit a sparse matrix
+    )
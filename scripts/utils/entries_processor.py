@@ -9,6 +9,7 @@ from datetime import datetime
 from utils.utils import get_person
 from utils.dataset_enricher import enrich_dataframe, get_feature_list
 from utils.category_map import categorize_row
+from utils.archive_store import archive_file, DEFAULT_MAX_BUNDLE_MB
 
 def categorize_entries(df_dict: { pd.DataFrame, pd.DataFrame }, resource: any):
     if type(resource) is list:
@@ -89,9 +90,22 @@ def write_output_file(transactions: list, input_file:str, output_folder: str, fi
 
 def move_file_to_archive(
     input_file: str,
-    output_folder: str
+    output_folder: str,
+    settings: dict = None
 ):
+    """
+    Archives a processed file according to the 'archive' settings in config.yaml:
+    - backend 'folder' (default): the file is moved as-is into the output folder;
+    - backend 'bundle': the file is appended to a compressed bundle in the output folder.
+    """
+    settings = settings or {}
     try:
+        if settings.get('backend', 'folder') == 'bundle':
+            entry = archive_file(input_file, output_folder, settings.get('max_bundle_mb') or DEFAULT_MAX_BUNDLE_MB)
+            destination = os.path.join(output_folder, entry['bundle'])
+            logging.info(f"File archived to '{os.path.relpath(destination)}' as '{entry['member']}'.")
+            return
+
         file_name = os.path.basename(input_file)
         destination = os.path.join(output_folder, file_name)
 
@@ -0,0 +1,258 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from datetime import datetime
+from utils import dataset_enricher
+from utils.dataset_enricher import enrich_dataframe, build_preprocessor, get_target_label, get_text_feature, get_categorical_features
+
+# Bump when the on-disk layout of a feature set changes
+STORE_FORMAT = 2
+KEEP_VERSIONS = 3
+LATEST_FILE = "latest.json"
+MANIFEST_FILE = "manifest.json"
+MATRIX_ARRAYS = ("data", "indices", "indptr")
+
+# Limits for featurizing appended rows with a preprocessor fitted on fewer rows
+DEFAULT_MAX_APPEND_FRACTION = 0.1
+DEFAULT_MAX_CHAINED_APPENDS = 5
+
+def load_feature_set(training_file: str, store_folder: str, settings: dict = None) -> dict:
+    """
+    Returns the enriched training data and its sparse feature matrix, materializing them
+    in the feature store when needed. A version is keyed by the content hash of the
+    training file, of the feature definitions in 'dataset_enricher.py' and of the training
+    file the preprocessor was fitted on:
+    - an exact match is loaded from disk (the matrix is memory-mapped);
+    - if the training file only had rows appended, just those rows are featurized
+      with the preprocessor fitted for the previous version, unless they hold text tokens
+      or categories that preprocessor has not seen, or the rows appended since it was
+      fitted exceed 'max_append_fraction' of the rows it was fitted on or
+      'max_chained_appends' appends (see the 'feature_store' section of config.yaml);
+    - otherwise the preprocessor is refitted and every row is featurized.
+    """
+    if not os.path.exists(training_file):
+        raise FileNotFoundError(f"Training file not found: {training_file}")
+    settings = validate_store_settings(settings or {})
+
+    training_hash = get_file_hash(training_file)
+    definitions_hash = get_feature_definitions_hash()
+    previous = get_latest_manifest(store_folder)
+    if (previous and previous['training_file_hash'] == training_hash
+            and previous['definitions_hash'] == definitions_hash):
+        logging.info(f"Feature set {previous['version']} found in '{os.path.relpath(store_folder)}'.")
+        return read_feature_set(os.path.join(store_folder, previous['version']))
+
+    df = read_training_data(training_file)
+    base = None
+    if is_append_of(previous, training_file, definitions_hash) and len(df) > previous['rows']:
+        new_rows = df.iloc[previous['rows']:].reset_index(drop=True)
+        enrich_dataframe(new_rows)
+        base = read_feature_set(os.path.join(store_folder, previous['version']))
+        reason = get_refit_reason(base, new_rows, settings)
+        if reason:
+            logging.info(f"Refitting the preprocessor: {reason}.")
+            base = None
+
+    # A version depends on the rows its preprocessor was fitted on, not only on the training file
+    fit_hash = base['manifest']['fit_training_hash'] if base else training_hash
+    version = hashlib.sha256(f"{training_hash}:{definitions_hash}:{fit_hash}".encode()).hexdigest()[:16]
+    version_folder = os.path.join(store_folder, version)
+    if os.path.exists(os.path.join(version_folder, MANIFEST_FILE)):
+        logging.info(f"Feature set {version} found in '{os.path.relpath(store_folder)}'.")
+        set_latest_version(store_folder, version)
+        return read_feature_set(version_folder)
+
+    if base:
+        logging.info(f"Featurizing {len(new_rows)} row(s) appended since feature set {base['version']}...")
+        preprocessor = base['preprocessor']
+        features = pd.concat([base['features'], new_rows], ignore_index=True)
+        matrix = sp.vstack([base['matrix'], sp.csr_matrix(preprocessor.transform(new_rows))], format='csr')
+        fit_rows = base['manifest']['fit_rows']
+        appends = base['manifest']['appends'] + 1
+    else:
+        logging.info(f"Featurizing {len(df)} row(s) from '{os.path.relpath(training_file)}'...")
+        enrich_dataframe(df)
+        preprocessor = build_preprocessor()
+        features = df
+        matrix = sp.csr_matrix(preprocessor.fit_transform(df))
+        fit_rows = len(df)
+        appends = 0
+
+    manifest = {
+        'format': STORE_FORMAT,
+        'version': version,
+        'base_version': base['version'] if base else None,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'training_file_hash': training_hash,
+        'training_file_size': os.path.getsize(training_file),
+        'definitions_hash': definitions_hash,
+        'fit_training_hash': fit_hash,
+        'fit_rows': fit_rows,
+        'appends': appends,
+        'rows': matrix.shape[0],
+        'shape': list(matrix.shape),
+    }
+    write_feature_set(version_folder, manifest, features, matrix, preprocessor)
+    set_latest_version(store_folder, version)
+    prune_versions(store_folder, keep=[version])
+    logging.info(f"Feature set {version} saved ({matrix.shape[0]} rows, {matrix.shape[1]} features).")
+    return read_feature_set(version_folder)
+
+def validate_store_settings(settings: dict) -> dict:
+    # Returns the feature store limits as numbers, defaults for empty ones; raises ValueError on non-numeric limits
+    limits = {
+        'max_append_fraction': (float, DEFAULT_MAX_APPEND_FRACTION),
+        'max_chained_appends': (int, DEFAULT_MAX_CHAINED_APPENDS),
+    }
+    validated = {}
+    for key, (convert, default) in limits.items():
+        value = settings.get(key)
+        if value is None:
+            validated[key] = default
+            continue
+        try:
+            validated[key] = convert(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Feature store setting '{key}' must be a number, got '{value}'.")
+    return validated
+
+def get_refit_reason(base: dict, new_rows: pd.DataFrame, settings: dict) -> str:
+    # Returns why the appended rows cannot reuse the preprocessor of the base version, None if they can
+    manifest = base['manifest']
+    max_fraction = settings['max_append_fraction']
+    max_appends = settings['max_chained_appends']
+
+    if manifest['appends'] + 1 > max_appends:
+        return f"more than {max_appends} chained appends"
+    appended_rows = manifest['rows'] + len(new_rows) - manifest['fit_rows']
+    if appended_rows > max_fraction * manifest['fit_rows']:
+        return f"{appended_rows} row(s) appended since the fit, more than {max_fraction:.0%} of {manifest['fit_rows']}"
+
+    unseen = get_unseen_values(base['preprocessor'], new_rows)
+    if unseen:
+        sample = ", ".join(sorted(unseen)[:5])
+        return f"{len(unseen)} unseen token(s) or categories in the appended rows ({sample}...)"
+    return None
+
+def get_unseen_values(preprocessor, rows: pd.DataFrame) -> set:
+    # Text tokens and categories of the rows the fitted preprocessor has no feature for
+    unseen = set()
+    text_transformer = preprocessor.named_transformers_['text']
+    analyzer = text_transformer.build_analyzer()
+    for text in rows[get_text_feature()]:
+        unseen.update(t for t in analyzer(text) if t not in text_transformer.vocabulary_)
+
+    categorical_transformer = preprocessor.named_transformers_['cat']
+    for column, categories in zip(get_categorical_features(), categorical_transformer.categories_):
+        unseen.update(f"{column}={v}" for v in set(rows[column]) - set(categories))
+    return unseen
+
+def read_training_data(training_file: str) -> pd.DataFrame:
+    return pd.read_csv(training_file, sep=';', encoding='ansi', dtype=str, keep_default_na=False)
+
+def get_file_hash(file_path: str, size: int = None) -> str:
+    # SHA-256 of the file content, or of its first 'size' bytes
+    digest = hashlib.sha256()
+    remaining = os.path.getsize(file_path) if size is None else size
+    with open(file_path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+def get_feature_definitions_hash() -> str:
+    digest = hashlib.sha256(f"format={STORE_FORMAT}".encode())
+    with open(dataset_enricher.__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+def is_append_of(previous: dict, training_file: str, definitions_hash: str) -> bool:
+    # True if the training file is the previous version's file with rows appended to it
+    if not previous or previous.get('definitions_hash') != definitions_hash:
+        return False
+    previous_size = previous['training_file_size']
+    if previous_size == 0 or os.path.getsize(training_file) <= previous_size:
+        return False
+    with open(training_file, 'rb') as f:
+        f.seek(previous_size - 1)
+        if f.read(1) != b'\n':
+            return False  # the last previous row has been extended, not followed
+    return get_file_hash(training_file, previous_size) == previous['training_file_hash']
+
+def write_feature_set(version_folder: str, manifest: dict, features: pd.DataFrame, matrix, preprocessor):
+    # Write to a temporary folder first so a partially written version is never picked up
+    temp_folder = version_folder + ".tmp"
+    if os.path.exists(temp_folder):
+        shutil.rmtree(temp_folder)
+    os.makedirs(temp_folder)
+
+    matrix.sort_indices()
+    for name in MATRIX_ARRAYS:
+        np.save(os.path.join(temp_folder, f"{name}.npy"), getattr(matrix, name))
+    features.to_pickle(os.path.join(temp_folder, "features.pkl"))
+    joblib.dump(preprocessor, os.path.join(temp_folder, "preprocessor.pkl"))
+    with open(os.path.join(temp_folder, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(version_folder):
+        shutil.rmtree(version_folder)
+    os.replace(temp_folder, version_folder)
+
+def read_feature_set(version_folder: str) -> dict:
+    with open(os.path.join(version_folder, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    # Memory-map the CSR arrays: the matrix is used as stored, without reading it into memory
+    arrays = [np.load(os.path.join(version_folder, f"{name}.npy"), mmap_mode='r') for name in MATRIX_ARRAYS]
+    matrix = sp.csr_matrix(tuple(arrays), shape=tuple(manifest['shape']), copy=False)
+    features = pd.read_pickle(os.path.join(version_folder, "features.pkl"))
+
+    return {
+        'version': manifest['version'],
+        'manifest': manifest,
+        'features': features,
+        'labels': features[get_target_label()],
+        'matrix': matrix,
+        'preprocessor': joblib.load(os.path.join(version_folder, "preprocessor.pkl")),
+    }
+
+def get_latest_manifest(store_folder: str) -> dict:
+    latest_file = os.path.join(store_folder, LATEST_FILE)
+    if not os.path.exists(latest_file):
+        return None
+    try:
+        with open(latest_file, 'r', encoding='utf-8') as f:
+            version = json.load(f)['version']
+        with open(os.path.join(store_folder, version, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable feature store state: {e}")
+        return None
+
+def set_latest_version(store_folder: str, version: str):
+    os.makedirs(store_folder, exist_ok=True)
+    latest_file = os.path.join(store_folder, LATEST_FILE)
+    with open(latest_file + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({'version': version}, f)
+    os.replace(latest_file + ".tmp", latest_file)
+
+def prune_versions(store_folder: str, keep: list):
+    # Keep the most recent versions only, older ones can be rebuilt from the training file
+    versions = []
+    for name in os.listdir(store_folder):
+        manifest_file = os.path.join(store_folder, name, MANIFEST_FILE)
+        if os.path.exists(manifest_file):
+            versions.append((os.path.getmtime(manifest_file), name))
+    versions.sort(reverse=True)
+    for _, name in versions[KEEP_VERSIONS:]:
+        if name not in keep:
+            shutil.rmtree(os.path.join(store_folder, name), ignore_errors=True)
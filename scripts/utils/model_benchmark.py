@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import statistics
+import joblib
+import pandas as pd
+
+# Budget keys in config.yaml mapped to the measured metric they limit.
+# Prediction is budgeted as throughput, independent of the size of the benchmark batch.
+MAX_BUDGET_METRICS = {
+    'max_model_size_mb': 'size_mb',
+    'max_load_ms': 'load_ms',
+}
+MIN_BUDGET_METRICS = {
+    'min_rows_per_sec': 'rows_per_sec',
+}
+COST_METRICS = ('size_mb', 'load_ms', 'predict_ms')
+SCORE_METRIC = 'precision_macro'
+
+def benchmark_model(model, X_batch: pd.DataFrame, work_folder: str, repeats: int = 5) -> dict:
+    """
+    Measures what a model costs on every processing run: the size of the pickled artifact,
+    the time 'joblib.load' takes to read it back and the time to predict a batch of rows.
+    Times are the median of 'repeats' runs.
+    """
+    fd, artifact = tempfile.mkstemp(suffix=".pkl", dir=work_folder)
+    os.close(fd)
+    try:
+        joblib.dump(model, artifact)
+        size_mb = os.path.getsize(artifact) / (1024 * 1024)
+
+        load_times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            loaded = joblib.load(artifact)
+            load_times.append(time.perf_counter() - start)
+    finally:
+        os.remove(artifact)
+
+    predict_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        loaded.predict(X_batch)
+        predict_times.append(time.perf_counter() - start)
+
+    predict_s = statistics.median(predict_times)
+    return {
+        'size_mb': round(size_mb, 3),
+        'load_ms': round(statistics.median(load_times) * 1000, 2),
+        'predict_ms': round(predict_s * 1000, 2),
+        'rows_per_sec': round(len(X_batch) / predict_s, 1) if predict_s > 0 else None,
+    }
+
+def dominates(a: dict, b: dict) -> bool:
+    # 'a' is at least as good as 'b' everywhere and strictly better somewhere
+    not_worse = a[SCORE_METRIC] >= b[SCORE_METRIC] and all(a[m] <= b[m] for m in COST_METRICS)
+    better = a[SCORE_METRIC] > b[SCORE_METRIC] or any(a[m] < b[m] for m in COST_METRICS)
+    return not_worse and better
+
+def mark_pareto_front(candidates: list) -> list:
+    # Flags the candidates no other candidate dominates on precision, size, load and predict time
+    for candidate in candidates:
+        candidate['pareto'] = not any(dominates(other, candidate) for other in candidates if other is not candidate)
+    return [c for c in candidates if c['pareto']]
+
+def validate_budget(budget: dict) -> dict:
+    # Returns the budget limits as numbers, raises ValueError on unknown keys or non-numeric limits
+    known_keys = {**MAX_BUDGET_METRICS, **MIN_BUDGET_METRICS}
+    limits = {}
+    for key, limit in budget.items():
+        if key not in known_keys:
+            raise ValueError(f"Unknown training budget key '{key}', expected one of {sorted(known_keys)}.")
+        if limit is None:
+            continue
+        try:
+            limits[key] = float(limit)
+        except (TypeError, ValueError):
+            raise ValueError(f"Training budget '{key}' must be a number, got '{limit}'.")
+    return limits
+
+def within_budget(candidate: dict, budget: dict) -> bool:
+    for key, metric in MAX_BUDGET_METRICS.items():
+        if key in budget and candidate[metric] > budget[key]:
+            return False
+    for key, metric in MIN_BUDGET_METRICS.items():
+        # No throughput is measured when prediction is below the timer resolution
+        if key in budget and candidate[metric] is not None and candidate[metric] < budget[key]:
+            return False
+    return True
+
+def select_candidate(candidates: list, budget: dict) -> dict:
+    """
+    Returns the most precise candidate within the budget, the fastest to predict on ties.
+    If no candidate fits the budget, the most precise candidate overall is returned.
+    """
+    for candidate in candidates:
+        candidate['within_budget'] = within_budget(candidate, budget)
+
+    eligible = [c for c in candidates if c['within_budget']]
+    if not eligible:
+        logging.warning(f"No candidate model fits the budget {budget}, selecting the most precise one.")
+        eligible = candidates
+    return max(eligible, key=lambda c: (c[SCORE_METRIC], -c['predict_ms']))
+
+def write_report(report_file: str, candidates: list, selected: dict, budget: dict, batch_rows: int):
+    report = {
+        'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'budget': budget,
+        'batch_rows': batch_rows,
+        'selected': selected['params'],
+        'pareto_front': [c['params'] for c in candidates if c['pareto']],
+        'candidates': candidates,
+    }
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    logging.info(f"Benchmark report saved to '{os.path.relpath(report_file)}'.")